@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+from anytree import Node
+from board import Board
+from game import Game, MINMAX_DEPTH, MONTE_CARLO_NUM_SIMULATIONS, MONTE_CARLO_ADAPTIVE
+from gamestate import GameState
+from multiprocessing import Pool, cpu_count
+
+import argparse
+import json
+import numpy as np
+import sys
+import time
+
+DRAW = 0
+BLACK = 1
+WHITE = 2
+
+# Analysis defaults
+ANALYSIS_TOP_MOVES = 3
+
+# Position string characters. A position is 64 board characters, row by row
+# from a1 to h8, optionally followed by the player to move (black if omitted).
+# Whitespace is ignored.
+POSITION_CHARS = {"-": 0, ".": 0, "X": BLACK, "O": WHITE}
+PLAYER_CHARS = ["", "X", "O"]
+
+
+# [move_to_string]
+# @description: Converts a board array position to [a-h][1-8] notation
+# @param1: Board array position (0 to 63), or None for a pass
+def move_to_string(move_pos):
+    if move_pos is None:
+        return "pass"
+    return str(chr((move_pos%8)+97)) + str((move_pos//8)+1)
+
+
+# [parse_position]
+# @description: Parses a position string into board positions and the player
+#   to move
+# @param1: Position string
+# @return: Tuple of (list of 64 positions, player to move)
+def parse_position(position):
+    chars = "".join(position.split()).upper()
+    if len(chars) not in [64, 65]:
+        raise ValueError("Position must have 64 squares plus an optional player to move: " + position)
+    if len(chars) == 65 and chars[64] not in PLAYER_CHARS[1:]:
+        raise ValueError("Invalid player to move '" + chars[64] + "' in position: " + position)
+    for char in chars[:64]:
+        if char not in POSITION_CHARS:
+            raise ValueError("Invalid square '" + char + "' in position: " + position)
+    positions = [POSITION_CHARS[char] for char in chars[:64]]
+    player_num = BLACK
+    if len(chars) == 65:
+        player_num = PLAYER_CHARS.index(chars[64])
+    return positions, player_num
+
+
+# [get_principal_variation]
+# @description: Follows the best replies down a rolled up minmax tree. Nodes
+#   take the minimum of their children on odd levels and the maximum on even
+#   levels, the same way Game.evaluate_minmax_tree rolls them up.
+# @param1: Top level node of the minmax tree
+# @return: List of moves, starting with the top level move
+def get_principal_variation(node):
+    variation = [node.name[0]]
+    level = 1
+    while node.children:
+        if level % 2 == 1:
+            node = min(node.children, key=lambda child: child.name[1])
+        else:
+            node = max(node.children, key=lambda child: child.name[1])
+        variation.append(node.name[0])
+        level += 1
+    return variation
+
+
+# [analyze_position]
+# @description: Analyzes a position with the same minmax search and monte
+#   carlo simulations that Game.generate_move uses, and reports the top moves
+# @param1: Position string (see parse_position)
+# @param2: Number of top moves to report
+# @param3: Minmax search depth
+# @param4: Total number of monte carlo simulations (0 to skip them)
+# @param5: True to use adaptive monte carlo sampling
+# @return: Dictionary of analysis results, ready to be written as JSON
+def analyze_position(position, top_moves=ANALYSIS_TOP_MOVES, depth=MINMAX_DEPTH,
+                     num_simulations=MONTE_CARLO_NUM_SIMULATIONS, adaptive=MONTE_CARLO_ADAPTIVE):
+    positions, player_num = parse_position(position)
+    game = Game()
+    game._board = Board.from_array(positions)
+
+    # If the player to move has to pass, analyze for the other player
+    state = GameState(game._board, player_num)
+    if not state.is_game_over():
+        player_num = state.current_player()
+        game._available_moves[player_num] = state.available_moves()
+
+    analysis = {
+        "position": position,
+        "player": PLAYER_CHARS[player_num],
+        "moves": [],
+        "nodes": 0,
+        "playouts": 0,
+        "minmax_time": 0.0,
+        "monte_carlo_time": 0.0
+    }
+    if state.is_game_over():
+        return analysis
+
+    # Minmax search, keeping the tree so we can report principal variations
+    start_time = time.time()
+    game._minmax_tree = Node("root")
+    game.build_minmax_tree(state, game._minmax_tree, depth, player_num)
+    for child in game._minmax_tree.children:
+        game.evaluate_minmax_tree(child, 1)
+    analysis["nodes"] = len(game._minmax_tree.descendants)
+    analysis["minmax_time"] = time.time() - start_time
+
+    # Monte carlo simulations
+    monte_carlo_results = {}
+    if num_simulations > 0:
+        start_time = time.time()
+        monte_carlo_results = game.run_monte_carlo(player_num, num_simulations, adaptive)
+        analysis["playouts"] = sum([sum(results) for results in monte_carlo_results.values()])
+        analysis["monte_carlo_time"] = time.time() - start_time
+
+    top_level = sorted(game._minmax_tree.children, key=lambda child: child.name[1], reverse=True)
+    for child in top_level[:top_moves]:
+        move = child.name[0]
+        move_analysis = {
+            "move": move_to_string(move),
+            "score": int(child.name[1]),
+            "pv": [move_to_string(pv_move) for pv_move in get_principal_variation(child)]
+        }
+        if move in monte_carlo_results and sum(monte_carlo_results[move]) > 0:
+            results = monte_carlo_results[move]
+            num_played = float(sum(results))
+            move_analysis["win"] = results[player_num] / num_played
+            move_analysis["draw"] = results[DRAW] / num_played
+            move_analysis["loss"] = results[player_num^3] / num_played
+            move_analysis["playouts"] = int(num_played)
+        analysis["moves"].append(move_analysis)
+    return analysis
+
+
+# [analyze_batch_position]
+# @description: Pool worker for analyze_batch. Reseeds the random number
+#   generator so forked workers don't share monte carlo games.
+# @param1: Tuple of (position, seed, analyze_position keyword arguments)
+def analyze_batch_position(job):
+    position, seed, options = job
+    np.random.seed(seed)
+    return analyze_position(position, **options)
+
+
+# [analyze_batch]
+# @description: Analyzes many positions in parallel
+# @param1: List of position strings
+# @param2: Number of worker processes
+# @param3: Keyword arguments passed on to analyze_position
+# @return: List of analysis results, in the same order as the positions
+def analyze_batch(positions, processes, **options):
+    jobs = [(position, seed, options) for seed, position in enumerate(positions)]
+    pool = Pool(processes)
+    try:
+        return pool.map(analyze_batch_position, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+# [read_positions]
+# @description: Reads position strings from a file, one per line, skipping
+#   blank lines and # comments
+# @param1: Open file
+# @return: List of position strings
+def read_positions(position_file):
+    return [line.strip() for line in position_file if line.strip() and not line.startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze Othello positions, one JSON result per line")
+    parser.add_argument("positions", nargs="*", help="Position strings: 64 squares (. X O) plus optional player to move")
+    parser.add_argument("--file", help="Read positions from a file, one per line ('-' for stdin)")
+    parser.add_argument("--top", type=int, default=ANALYSIS_TOP_MOVES, help="Number of top moves to report")
+    parser.add_argument("--depth", type=int, default=MINMAX_DEPTH, help="Minmax search depth")
+    parser.add_argument("--simulations", type=int, default=MONTE_CARLO_NUM_SIMULATIONS, help="Monte carlo simulations per position (0 to skip)")
+    parser.add_argument("--uniform", action="store_true", help="Split monte carlo simulations evenly instead of adaptively")
+    parser.add_argument("--processes", type=int, default=cpu_count(), help="Number of worker processes")
+    args = parser.parse_args()
+
+    positions = list(args.positions)
+    if args.file == "-":
+        positions += read_positions(sys.stdin)
+    elif args.file:
+        with open(args.file) as position_file:
+            positions += read_positions(position_file)
+    if not positions:
+        parser.error("No positions to analyze")
+
+    results = analyze_batch(positions, args.processes, top_moves=args.top, depth=args.depth,
+                            num_simulations=args.simulations, adaptive=not args.uniform)
+    for result in results:
+        print(json.dumps(result, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
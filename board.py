@@ -1,55 +1,117 @@
-import copy
 import numpy as np
 
 BLACK = 1
 WHITE = 2
 
+# [build_adjacent_positions]
+# @description: Builds the adjacent positions table, so we can later look up
+#   all adjacent positions to any index in constant time.
+# @return: List of adjacent position lists, indexed by position (0 to 63)
+def build_adjacent_positions():
+    adjacent_positions = []
+    for pos in range(0, 64):
+        adj_pos=[ 
+            (pos-9),  (pos-8),  (pos-7),
+            (pos-1),            (pos+1),
+            (pos+7),  (pos+8),  (pos+9)
+        ]
+        # Trim invalid board spaces
+        adj_pos = [x for x in adj_pos if (x >= 0 and x <= 63)]
+        if pos % 8 == 0:
+            adj_pos = [x for x in adj_pos if (x % 8 != 7)]
+        elif pos % 8 == 7:
+            adj_pos = [x for x in adj_pos if (x % 8 != 0)]
+        # Now insert this into the master list
+        adjacent_positions.insert(pos, adj_pos)
+    return adjacent_positions
+
+# Static tables, built once per process and shared read-only by every Board.
+# Boards only get their own weight tables through set_weighted_positions.
+ADJACENT_POSITIONS = build_adjacent_positions()
+WEIGHTED_POSITIONS = np.zeros(shape=(3, 64), dtype=int)
+WEIGHTED_POSITIONS[BLACK] = [
+    120, -20, 20,  5,   5,   20,  -20, 120,
+    -20, -40, -5,  -5,  -5,  -5,  -40, -20,
+    20,  -5,  15,  3,   3,   15,  -5,  20,
+    5,   -5,  3,   3,   3,   3,   -5,  5,
+    5,   -5,  3,   3,   3,   3,   -5,  5,
+    20,  -5,  15,  3,   3,   15,  -5,  20,
+    -20, -40, -5,  -5,  -5,  -5,  -40, -20,
+    120, -20, 20,  5,   5,   20,  -20, 120
+]
+WEIGHTED_POSITIONS[WHITE] = [
+    120, -20, 20,  5,   5,   20,  -20, 120,
+    -20, -40, -5,  -5,  -5,  -5,  -40, -20,
+    20,  -5,  15,  3,   3,   15,  -5,  20,
+    5,   -5,  3,   3,   3,   3,   -5,  5,
+    5,   -5,  3,   3,   3,   3,   -5,  5,
+    20,  -5,  15,  3,   3,   15,  -5,  20,
+    -20, -40, -5,  -5,  -5,  -5,  -40, -20,
+    120, -20, 20,  5,   5,   20,  -20, 120
+]
+WEIGHTED_POSITIONS.flags.writeable = False
+# Weight tables indexed by the number of pieces on the board, so evaluate_score
+# can pick the table for the current game phase with a single lookup.
+PHASE_WEIGHTED_POSITIONS = [WEIGHTED_POSITIONS] * 65
+
 class Board(object):
 
+    __slots__ = ("_positions", "_weighted_positions", "_phase_weighted_positions")
+
+    _adjacent_positions = ADJACENT_POSITIONS
+
     def __init__(self):
         self._positions = np.zeros(64, np.int8)
-        self._weighted_positions = np.zeros(shape=(3, 64), dtype=int)
-        self._weighted_positions[BLACK] = [
-            120, -20, 20,  5,   5,   20,  -20, 120,
-            -20, -40, -5,  -5,  -5,  -5,  -40, -20,
-            20,  -5,  15,  3,   3,   15,  -5,  20,
-            5,   -5,  3,   3,   3,   3,   -5,  5,
-            5,   -5,  3,   3,   3,   3,   -5,  5,
-            20,  -5,  15,  3,   3,   15,  -5,  20,
-            -20, -40, -5,  -5,  -5,  -5,  -40, -20,
-            120, -20, 20,  5,   5,   20,  -20, 120
-        ]
-        self._weighted_positions[WHITE] = [
-            120, -20, 20,  5,   5,   20,  -20, 120,
-            -20, -40, -5,  -5,  -5,  -5,  -40, -20,
-            20,  -5,  15,  3,   3,   15,  -5,  20,
-            5,   -5,  3,   3,   3,   3,   -5,  5,
-            5,   -5,  3,   3,   3,   3,   -5,  5,
-            20,  -5,  15,  3,   3,   15,  -5,  20,
-            -20, -40, -5,  -5,  -5,  -5,  -40, -20,
-            120, -20, 20,  5,   5,   20,  -20, 120
-        ]
-        self._adjacent_positions = []
-        self.set_adjacent_positions()
-
-    # [Board.set_adjacent_positions]
-    # @description: Fills the _adjacent_positions array, so we can later look
-    #   up all adjacent positions to any index in constant time.
-    def set_adjacent_positions(self):
-        for pos in range(0, 64):
-            adj_pos=[ 
-                (pos-9),  (pos-8),  (pos-7),
-                (pos-1),            (pos+1),
-                (pos+7),  (pos+8),  (pos+9)
-            ]
-            # Trim invalid board spaces
-            adj_pos = [x for x in adj_pos if (x >= 0 and x <= 63)]
-            if pos % 8 == 0:
-                adj_pos = [x for x in adj_pos if (x % 8 != 7)]
-            elif pos % 8 == 7:
-                adj_pos = [x for x in adj_pos if (x % 8 != 0)]
-            # Now insert this into the master list
-            self._adjacent_positions.insert(pos, adj_pos)
+        self._weighted_positions = WEIGHTED_POSITIONS
+        self._phase_weighted_positions = PHASE_WEIGHTED_POSITIONS
+
+    # [Board.from_array]
+    # @description: Builds a board from an array of positions, using the
+    #   default weightings
+    # @param1: Class
+    # @param2: Array of 64 positions (0, 1 or 2)
+    # @return: New board
+    @classmethod
+    def from_array(cls, positions):
+        board = cls.__new__(cls)
+        board._positions = np.array(positions, dtype=np.int8)
+        board._weighted_positions = WEIGHTED_POSITIONS
+        board._phase_weighted_positions = PHASE_WEIGHTED_POSITIONS
+        return board
+
+    # [Board.copy]
+    # @description: Cheap copy of the board. Only the positions are copied,
+    #   weight tables are shared with this board.
+    # @param1: Self
+    # @return: New board
+    def copy(self):
+        board = Board.__new__(Board)
+        board._positions = self._positions.copy()
+        board._weighted_positions = self._weighted_positions
+        board._phase_weighted_positions = self._phase_weighted_positions
+        return board
+
+    # [Board.set_weighted_positions]
+    # @description: Replace the board weightings, optionally with a different
+    #   set of weights for each game phase. The same weights are used for both
+    #   players.
+    # @param1: Self
+    # @param2: List of phase weights, each a list of 64 position weights
+    # @param3: Piece counts at which each phase after the first begins
+    def set_weighted_positions(self, phase_weights, phase_starts=()):
+        if len(phase_weights) != len(phase_starts) + 1:
+            raise ValueError("Expected " + str(len(phase_starts) + 1) + " phase weights, got " + str(len(phase_weights)))
+        phase_tables = []
+        for weights in phase_weights:
+            table = np.zeros(shape=(3, 64), dtype=int)
+            table[BLACK] = weights
+            table[WHITE] = weights
+            phase_tables.append(table)
+        self._weighted_positions = phase_tables[0]
+        self._phase_weighted_positions = []
+        for num_pieces in range(65):
+            phase = len([start for start in phase_starts if num_pieces >= start])
+            self._phase_weighted_positions.append(phase_tables[phase])
 
     # [Board.evaluate_score]
     # @description: EValuate the game board score based on weightings
@@ -57,13 +119,14 @@ class Board(object):
     # @param2: Player number to calculate score for (1 or 2)
     def evaluate_score(self, player_num, player_pieces):
         opponent = player_num^3
+        weighted_positions = self._phase_weighted_positions[len(player_pieces[BLACK]) + len(player_pieces[WHITE])]
         player_score = 0
         for pos in player_pieces[player_num]:
-            player_score += self._weighted_positions[player_num][pos]
+            player_score += weighted_positions[player_num][pos]
         
         opponent_score = 0
         for pos in player_pieces[opponent]:
-            opponent_score += self._weighted_positions[opponent][pos]
+            opponent_score += weighted_positions[opponent][pos]
         
         score = player_score - opponent_score
         return score
@@ -2,10 +2,12 @@ from __future__ import print_function
 from anytree import Node, RenderTree
 from board import Board
 from datetime import datetime
+from gamestate import GameState
+from moveorder import MoveOrderer, position_key
 from random import randint
 from randomgame import RandomGame
 
-import copy
+import math
 import numpy as np
 import os
 import time
@@ -20,6 +22,18 @@ DRAW = 4
 MINMAX_DEPTH = 3
 MONTE_CARLO_NUM_SIMULATIONS = 15000
 
+# Adaptive monte carlo: sample all moves in rounds that start small and double
+# in size, dropping moves that are clearly behind, and stop as soon as the best
+# move is statistically clear. Spending never exceeds the uniform budget. Z is
+# the number of standard deviations used for the win rate confidence bounds.
+MONTE_CARLO_ADAPTIVE = True
+MONTE_CARLO_CONFIDENCE_Z = 2.58
+MONTE_CARLO_FIRST_ROUND_SIMULATIONS = 100
+
+# Alpha-beta search with move ordering prunes enough of the tree to look
+# further ahead than the full minmax tree in the same time.
+ALPHABETA_EXTRA_DEPTH = 1
+
 
 class Game(object):
 
@@ -30,7 +44,7 @@ class Game(object):
         self._player_names = ["","",""]
         self._player_pieces = [[],[],[]]
         self._available_moves = [[],[],[]]
-        self._game_turn = BLACK
+        self._move_orderer = MoveOrderer()
 
     # [Game.is_valid_input]
     # @description: Verify that an input string matches [a-h][1-8] format
@@ -69,39 +83,36 @@ class Game(object):
         self._available_moves[player_num] = moves
 
     # [Game.build_minmax_tree]
+    # @description: Builds the minmax tree on copies of a game state. Every
+    #   node is scored for the root player. When a player has to pass we add a
+    #   pass node (move None), so levels keep alternating between the root
+    #   player and the opponent.
     # @param1: Self
-    # @param2: Player who we are currently evaluating moves for (1 or 2)
-    # @param3: Available moves for this player
-    # @param4: Parent node in the minmax tree
-    # @param5: Current depth
-    def build_minmax_tree(self, player_num, available_moves, parent_move, parent_game, depth):
+    # @param2: Game state to expand, with the player to move at this level
+    # @param3: Parent node in the minmax tree
+    # @param4: Remaining depth
+    # @param5: Player we are choosing a move for at the root (1 or 2)
+    def build_minmax_tree(self, state, parent_move, depth, root_player):
         # Base case
-        if depth == 0:
+        if depth == 0 or state.is_game_over():
             return
 
         # Recursive case: minmax lookahead
-        opponent = player_num^3
-        for move in available_moves:
-
-            # Setup a new minmax game based on the recursive board state. Play the
-            # move, then reevaluate player pieces + opponent available moves
-            minmax_game = Game()
-            minmax_game = copy.deepcopy(parent_game)
-            minmax_game._board.play_move(player_num, move)
-            minmax_game.set_player_pieces(BLACK)
-            minmax_game.set_player_pieces(WHITE)
-            minmax_game.set_available_moves(opponent)
-
-            # If MINMAX_DEPTH is odd, we calculate for player_num on odd depths
-            # who then becomes opponent at even depths, and vice versa.
-            if depth % 2 == MINMAX_DEPTH % 2:
-                move_score = minmax_game._board.evaluate_score(player_num, minmax_game._player_pieces)
+        player_num = state.current_player()
+        for move in state.available_moves():
+
+            # Setup a new minmax state based on the recursive board state. Leaf
+            # states are scored without generating their moves.
+            minmax_state = state.copy()
+            minmax_state.play_move(move)
+            move_score = minmax_state._board.evaluate_score(root_player, minmax_state.player_pieces())
+
+            this_move = Node([move, move_score], parent=parent_move)
+            if depth > 1 and not minmax_state.is_game_over() and minmax_state.current_player() == player_num:
+                pass_move = Node([None, move_score], parent=this_move)
+                self.build_minmax_tree(minmax_state, pass_move, depth-2, root_player)
             else:
-                move_score = minmax_game._board.evaluate_score(opponent, minmax_game._player_pieces)
-
-            node_score = [move, move_score]
-            this_move = Node(node_score, parent=parent_move)
-            self.build_minmax_tree(opponent, minmax_game._available_moves[opponent], this_move, minmax_game, depth-1)
+                self.build_minmax_tree(minmax_state, this_move, depth-1, root_player)
 
     # [Game.get_minmax_results]
     # @description: Evaluate the minmax tree, give results for all available moves
@@ -135,6 +146,144 @@ class Game(object):
                         parent.name[1] = child.name[1]
 
 
+    # [Game.alphabeta]
+    # @description: Depth-first negamax search with alpha-beta pruning. Moves
+    #   are searched in the order given by the move orderer, which learns from
+    #   cutoffs and best moves as the search goes.
+    # @param1: Self
+    # @param2: Game state to search
+    # @param3: Player whose turn it is at this depth (1 or 2). If they have
+    #   to pass, the game state hands the turn to the other player.
+    # @param4: Remaining depth
+    # @param5: Alpha bound, from player_num's point of view
+    # @param6: Beta bound, from player_num's point of view
+    # @param7: Current ply (0 at the root)
+    # @return: Score of the position for player_num
+    def alphabeta(self, state, player_num, depth, alpha, beta, ply):
+        # Leaves are scored without generating any moves
+        if depth == 0 or state.is_game_over():
+            return state._board.evaluate_score(player_num, state.player_pieces())
+
+        opponent = player_num^3
+        if state.current_player() != player_num:
+            return -self.alphabeta(state, opponent, depth-1, -beta, -alpha, ply+1)
+
+        key = position_key(state._board, player_num)
+        best_move = None
+        for move in self._move_orderer.order_moves(player_num, state.available_moves(), ply, key):
+            search_state = state.copy()
+            search_state.play_move(move)
+            score = -self.alphabeta(search_state, opponent, depth-1, -beta, -alpha, ply+1)
+            if score > alpha:
+                alpha = score
+                best_move = move
+            if alpha >= beta:
+                self._move_orderer.record_cutoff(player_num, move, ply, depth)
+                break
+        if best_move is not None:
+            self._move_orderer.record_best_move(key, best_move)
+        return alpha
+
+    # [Game.get_alphabeta_results]
+    # @description: Iterative deepening alpha-beta search. Each iteration
+    #   seeds the move ordering for the next one. Every top level move is
+    #   searched with a full window so its score is exact.
+    # @param1: Self
+    # @param2: Player to generate results for (1 or 2)
+    # @param3: Maximum search depth
+    # @return: A list of all currently available moves, paired with a score for each
+    def get_alphabeta_results(self, player_num, max_depth):
+        self._move_orderer.new_search(self._board._weighted_positions)
+        root_state = GameState(self._board, player_num, self._available_moves[player_num])
+        opponent = player_num^3
+        key = position_key(self._board, player_num)
+        infinity = float("inf")
+        for depth in range(1, max_depth+1):
+            results = []
+            for move in self._move_orderer.order_moves(player_num, root_state.available_moves(), 0, key):
+                search_state = root_state.copy()
+                search_state.play_move(move)
+                score = -self.alphabeta(search_state, opponent, depth-1, -infinity, infinity, 1)
+                results.append([move, score])
+            best_result = max(results, key=lambda result: result[1])
+            self._move_orderer.record_best_move(key, best_result[0])
+        return results
+
+    # [Game.simulate_move]
+    # @description: Play a move followed by a number of random games
+    # @param1: Self
+    # @param2: Player number to play move for (1 or 2)
+    # @param3: Move position (0 to 63)
+    # @param4: Number of random games to play
+    # @param5: Results list [draws, black wins, white wins] to add to
+    def simulate_move(self, player_num, move, num_simulations, move_results):
+        opponent = player_num^3
+        for i in range(num_simulations):
+            # Play a random game
+            random_game = RandomGame(self._board.copy())
+            random_game._board.play_move(player_num, move)
+            move_results[random_game.play(opponent, False)] += 1
+
+    # [Game.run_monte_carlo]
+    # @description: Run monte carlo simulations for all available moves. In
+    #   adaptive mode the remaining moves are sampled in rounds that double in
+    #   size. After each round, moves whose win rate upper bound falls below the
+    #   best lower bound are dropped, and we stop early once the best lower
+    #   bound is above every other move's upper bound. Spending never exceeds
+    #   num_simulations.
+    # @param1: Self
+    # @param2: Player number to simulate moves for (1 or 2)
+    # @param3: Total number of random games to play
+    # @param4: True to use adaptive sampling, False to split the budget evenly
+    # @return: Dictionary of move -> [draws, black wins, white wins]
+    def run_monte_carlo(self, player_num, num_simulations, adaptive=False):
+        available_moves = self._available_moves[player_num]
+        monte_carlo_results = {}
+        for move in available_moves:
+            monte_carlo_results[move] = [0, 0, 0]
+
+        if not adaptive or len(available_moves) == 1:
+            num_simulations_per_move = max(1, num_simulations // len(available_moves))
+            for move in available_moves:
+                self.simulate_move(player_num, move, num_simulations_per_move, monte_carlo_results[move])
+            return monte_carlo_results
+
+        candidate_moves = list(available_moves)
+        round_simulations = MONTE_CARLO_FIRST_ROUND_SIMULATIONS
+        remaining_simulations = num_simulations
+        while len(candidate_moves) > 1:
+            num_simulations_per_move = min(round_simulations, remaining_simulations // len(candidate_moves))
+            if num_simulations_per_move == 0:
+                break
+            for move in candidate_moves:
+                self.simulate_move(player_num, move, num_simulations_per_move, monte_carlo_results[move])
+            remaining_simulations -= num_simulations_per_move * len(candidate_moves)
+            round_simulations *= 2
+
+            # Win rate and confidence bound for each remaining move. We use the
+            # worst case variance (p = 0.5) so the bound only depends on the
+            # number of games played.
+            lower_bounds = {}
+            upper_bounds = {}
+            for move in candidate_moves:
+                num_played = sum(monte_carlo_results[move])
+                win_rate = float(monte_carlo_results[move][player_num]) / float(num_played)
+                bound = MONTE_CARLO_CONFIDENCE_Z * math.sqrt(0.25 / num_played)
+                lower_bounds[move] = win_rate - bound
+                upper_bounds[move] = win_rate + bound
+            best_move = max(candidate_moves, key=lambda move: lower_bounds[move])
+
+            # Drop dominated moves. Once only the best move is left, it is
+            # clearly ahead of all the others and we can stop.
+            candidate_moves = [move for move in candidate_moves if move == best_move or upper_bounds[move] >= lower_bounds[best_move]]
+
+        # Moves that were never sampled (tiny budgets) still need a result
+        for move in available_moves:
+            if sum(monte_carlo_results[move]) == 0:
+                self.simulate_move(player_num, move, 1, monte_carlo_results[move])
+
+        return monte_carlo_results
+
     # [Game.generate_move]
     # @description Generates a (hopefully good) move for a player
     # @param1 Self
@@ -160,24 +309,14 @@ class Game(object):
             
         # Build a new minmax tree and get results for all nodes
         self._minmax_tree = Node("root")
-        self.build_minmax_tree(player_num, self._available_moves[player_num], self._minmax_tree, self, MINMAX_DEPTH)
+        root_state = GameState(self._board, player_num, self._available_moves[player_num])
+        self.build_minmax_tree(root_state, self._minmax_tree, MINMAX_DEPTH, player_num)
         #print(RenderTree(self._minmax_tree))
         minmax_results = self.get_minmax_results()
         #print("[generate_move] minmax_results=" + str(minmax_results))
 
         # Monte carlo simulations
-        num_simulations_per_move = MONTE_CARLO_NUM_SIMULATIONS // len(self._available_moves[player_num])
-        monte_carlo_results = []
-        opponent = player_num^3
-        for move in self._available_moves[player_num]:
-            this_move_results = [0, 0, 0]
-            for i in range(num_simulations_per_move):
-                # Play a random game
-                random_game = RandomGame()
-                random_game._board = copy.deepcopy(self._board)
-                random_game._board.play_move(player_num, move)
-                this_move_results[random_game.play(opponent, False)] += 1
-            monte_carlo_results.append([move, this_move_results])
+        monte_carlo_results = self.run_monte_carlo(player_num, MONTE_CARLO_NUM_SIMULATIONS, MONTE_CARLO_ADAPTIVE)
         #print("[generate_move] monte_carlo_results=" + str(monte_carlo_results))
 
         # Evaluate confidence of minmax results
@@ -189,7 +328,9 @@ class Game(object):
             #minmax_total_score += result[1]
             if result[1] < minmax_min_result:
                 minmax_min_result = result[1]
-        if minmax_min_result < 0:
+        # Shift so the minimum is at least 1, otherwise an all-zero result set
+        # (common from the opening) divides by zero below
+        if minmax_min_result <= 0:
             for result in minmax_results:
                 result[1] -= (minmax_min_result - 1)
         for result in minmax_results:
@@ -203,9 +344,9 @@ class Game(object):
         
         # Evaluate confidence of monte carlo simulations
         monte_carlo_confidence = {}
-        for result in monte_carlo_results:
-            this_result_confidence = float(result[1][player_num])/float(num_simulations_per_move)
-            monte_carlo_confidence[result[0]] = this_result_confidence
+        for move, this_move_results in monte_carlo_results.items():
+            this_result_confidence = float(this_move_results[player_num])/float(sum(this_move_results))
+            monte_carlo_confidence[move] = this_result_confidence
         #print("[generate_move] monte_carlo_confidence=" + str(monte_carlo_confidence))
 
         # Evaluate total confidence of available moves
@@ -235,26 +376,12 @@ class Game(object):
     # @param2 Player number to generate move for (1 or 2)
     def generate_move_test(self, player_num):
         
-        # Build a new minmax tree and get results for all nodes
-        self._minmax_tree = Node("root")
-        self.build_minmax_tree(player_num, self._available_moves[player_num], self._minmax_tree, self, MINMAX_DEPTH)
-        #print(RenderTree(self._minmax_tree))
-        minmax_results = self.get_minmax_results()
+        # Alpha-beta search with move ordering, one ply deeper than minmax
+        minmax_results = self.get_alphabeta_results(player_num, MINMAX_DEPTH + ALPHABETA_EXTRA_DEPTH)
         #print("[generate_move_alt] minmax_results=" + str(minmax_results))
 
         # Monte carlo simulations
-        num_simulations_per_move = MONTE_CARLO_NUM_SIMULATIONS // len(self._available_moves[player_num])
-        monte_carlo_results = []
-        opponent = player_num^3
-        for move in self._available_moves[player_num]:
-           this_move_results = [0, 0, 0]
-           for i in range(num_simulations_per_move):
-               # Play a random game
-               random_game = RandomGame()
-               random_game._board = copy.deepcopy(self._board)
-               random_game._board.play_move(player_num, move)
-               this_move_results[random_game.play(opponent, False)] += 1
-           monte_carlo_results.append([move, this_move_results])
+        monte_carlo_results = self.run_monte_carlo(player_num, MONTE_CARLO_NUM_SIMULATIONS, MONTE_CARLO_ADAPTIVE)
 
         # Evaluate confidence of minmax results
         minmax_confidence = {}
@@ -264,7 +391,9 @@ class Game(object):
         for result in minmax_results:
             if result[1] < minmax_min_result:
                 minmax_min_result = result[1]
-        if minmax_min_result < 0:
+        # Shift so the minimum is at least 1, otherwise an all-zero result set
+        # (common from the opening) divides by zero below
+        if minmax_min_result <= 0:
             for result in minmax_results:
                 result[1] -= (minmax_min_result - 1)
         for result in minmax_results:
@@ -278,9 +407,9 @@ class Game(object):
         
         # Evaluate confidence of monte carlo simulations
         monte_carlo_confidence = {}
-        for result in monte_carlo_results:
-            this_result_confidence = float(result[1][player_num])/float(num_simulations_per_move)
-            monte_carlo_confidence[result[0]] = this_result_confidence
+        for move, this_move_results in monte_carlo_results.items():
+            this_result_confidence = float(this_move_results[player_num])/float(sum(this_move_results))
+            monte_carlo_confidence[move] = this_result_confidence
         #print("[generate_move_alt] monte_carlo_confidence=" + str(monte_carlo_confidence))
 
         # Evaluate total confidence of available moves
@@ -310,30 +439,25 @@ class Game(object):
     # @param2: Which player is human (BLACK or WHITE)
     def play_human(self, human_player):
 
-        self._player_pieces[BLACK] = [28, 35]
-        self._player_pieces[WHITE] = [27, 36]
-        for p in self._player_pieces[BLACK]: self._board._positions[p] = BLACK
-        for p in self._player_pieces[WHITE]: self._board._positions[p] = WHITE
-        self.set_available_moves(BLACK)
-        self.set_available_moves(WHITE)
+        state = GameState.starting_position(self._board)
 
         self._player_names[human_player] = "human"
         self._player_names[human_player^3] = "computer"
 
-        # Main game loop
-        while self._game_turn != GAME_OVER:
+        # Main game loop. The game state takes care of passes and game over.
+        while not state.is_game_over():
 
-            current_player = self._game_turn
-            opponent = self._game_turn^3
+            current_player = state.current_player()
+            opponent = current_player^3
             
             self.set_player_pieces(BLACK)
             self.set_player_pieces(WHITE)
+            self._available_moves[current_player] = state.available_moves()
             self._board.show(self._available_moves[current_player])
 
             print("\nBlack (" + self._player_names[BLACK] + ") pieces: " + str(self._player_pieces[BLACK]))
             print("White (" + self._player_names[WHITE] + ") pieces: " + str(self._player_pieces[WHITE]))
-            print("Black (" + self._player_names[BLACK] + ") available moves: " + str(self._available_moves[BLACK]))
-            print("White (" + self._player_names[WHITE] + ") available moves: " + str(self._available_moves[WHITE]) + "\n")
+            print(self._player_names[current_player].capitalize() + " available moves: " + str(self._available_moves[current_player]) + "\n")
 
             # Human turn
             if current_player == human_player:
@@ -347,46 +471,31 @@ class Game(object):
                 move_pos = (int(int(move_input[1]))-1)*8 + (int(ord(move_input[0])-96)-1)
 
                 if move_pos in self._available_moves[current_player]:
-                    self._board.play_move(current_player, move_pos)
+                    state.play_move(move_pos)
                     print("Human played " + move_input + " (position " + str(move_pos) + ")\n")
-                    self.set_available_moves(opponent)
-                    # Check if other player passes, or if game is over
-                    if len(self._available_moves[opponent]) == 0:
-                        self.set_available_moves(current_player)
-                        if len(self._available_moves[current_player]) == 0:
-                            self._game_turn = GAME_OVER
-                        else:
-                            print("Human has no available moves. Passing.")
-                    else:
-                        self._game_turn = opponent
                 else:
                     print("\n*** Invalid move! Try again ***\n")
                     time.sleep(1)
+                    continue
 
             # Computer turn
             else:
                 print("Computer is thinking...\n")
                 start_time = datetime.now()
                 move_pos = self.generate_move(current_player)
-                self._board.play_move(current_player, move_pos)
+                state.play_move(move_pos)
                 end_time = datetime.now()
                 move_time = (end_time - start_time)
 
                 print("\n\nComputer played " + str(chr((move_pos%8)+97)) + str((move_pos//8)+1) + " (position " + str(move_pos) + "), move took " + str(move_time) + "\n")
-                self.set_available_moves(opponent)
-                # Check if other player passes, or if game is over
-                if len(self._available_moves[opponent]) == 0:
-                    self.set_available_moves(current_player)
-                    if len(self._available_moves[current_player]) == 0:
-                        self._game_turn = GAME_OVER
-                    else:
-                        print("Computer has no available moves. Passing.")
-                else:
-                    self._game_turn = opponent
+
+            # Check if other player passes
+            if not state.is_game_over() and state.passed():
+                print(self._player_names[opponent].capitalize() + " has no available moves. Passing.")
 
         # At this point we're out of the main loop, game is over! First
         print("\n\nGame over!\n")
-        self._board.show(self._available_moves[human_player])
+        self._board.show([])
         self.set_player_pieces(BLACK)
         self.set_player_pieces(WHITE)
         print("Black has " + str(len(self._player_pieces[BLACK])) + " pieces")
@@ -403,32 +512,26 @@ class Game(object):
     #   different strategies and board weightings.
     # @param1: Self
     def robot_battle(self, verbose=True):
-        self._player_pieces[BLACK] = [28, 35]
-        self._player_pieces[WHITE] = [27, 36]
-        for p in self._player_pieces[BLACK]: self._board._positions[p] = BLACK
-        for p in self._player_pieces[WHITE]: self._board._positions[p] = WHITE
-        self.set_available_moves(BLACK)
-        self.set_available_moves(WHITE)
+        state = GameState.starting_position(self._board)
 
         self._player_names[BLACK] = "Black"
         self._player_names[WHITE] = "White"
-        self._game_turn = BLACK
 
-        # Main game loop
-        while self._game_turn != GAME_OVER:
+        # Main game loop. The game state takes care of passes and game over,
+        # so the current player always has a move to play.
+        while not state.is_game_over():
 
-            current_player = self._game_turn
-            opponent = self._game_turn^3
+            current_player = state.current_player()
             
             self.set_player_pieces(BLACK)
             self.set_player_pieces(WHITE)
+            self._available_moves[current_player] = state.available_moves()
 
             if verbose:
                 self._board.show(self._available_moves[current_player])
                 print("\nBlack pieces: " + str(self._player_pieces[BLACK]))
                 print("White pieces: " + str(self._player_pieces[WHITE]))
-                print("Black available moves: " + str(self._available_moves[BLACK]))
-                print("White available moves: " + str(self._available_moves[WHITE]) + "\n")
+                print(self._player_names[current_player] + " available moves: " + str(self._available_moves[current_player]) + "\n")
 
             # Current player plays a move. BLACK player tries new experimental
             # features.
@@ -437,25 +540,17 @@ class Game(object):
                 move_pos = self.generate_move_test(current_player)
             else:
                 move_pos = self.generate_move(current_player)
-            self._board.play_move(current_player, move_pos)
+            state.play_move(move_pos)
             end_time = datetime.now()
             move_time = (end_time - start_time)
             
             move_num = len(self._player_pieces[BLACK]) + len(self._player_pieces[WHITE])
             if verbose:
                 print("\nMove " + str(move_num) + ": " + (str(self._player_names[current_player])) + " played " + str(chr((move_pos%8)+97)) + str((move_pos//8)+1) + " (position " + str(move_pos) + "), move took " + str(move_time) + "\n")
-            self.set_available_moves(opponent)
-            # Check if other player passes, or if game is over
-            if len(self._available_moves[opponent]) == 0:
-                self.set_available_moves(current_player)
-                if len(self._available_moves[current_player]) == 0:
-                    self._game_turn = GAME_OVER
-            else:
-                self._game_turn = opponent
 
         # At this point we're out of the main loop, game is over! First
         print("\n\nGame over!\n")
-        self._board.show(self._available_moves[current_player])
+        self._board.show([])
         self.set_player_pieces(BLACK)
         self.set_player_pieces(WHITE)
         print("Black has " + str(len(self._player_pieces[BLACK])) + " pieces")
@@ -0,0 +1,130 @@
+from board import Board
+
+import numpy as np
+
+DRAW = 0
+BLACK = 1
+WHITE = 2
+GAME_OVER = 3
+
+
+class GameState(object):
+
+    __slots__ = ("_board", "_game_turn", "_passes", "_available_moves")
+
+    # [GameState.init]
+    # @description Constructor. Tracks the side to move, consecutive passes
+    #   and the legal moves for the side to move on top of a board. Legal
+    #   moves are generated at most once per ply, and only when asked for.
+    # @param1: Self
+    # @param2: Board to play on. The board is played on directly.
+    # @param3: Player to move first (1 or 2)
+    # @param4: Legal moves for the player to move, if they are already known
+    def __init__(self, board, player_num=BLACK, available_moves=None):
+        self._board = board
+        self._game_turn = player_num
+        self._passes = 0
+        self._available_moves = available_moves
+
+    # [GameState.starting_position]
+    # @description: Sets up the four starting pieces and builds a game state
+    #   for a new game, black to move
+    # @param1: Class
+    # @param2: Board to set up, defaults to a new board
+    # @return: New game state
+    @classmethod
+    def starting_position(cls, board=None):
+        if board is None:
+            board = Board()
+        for p in [28, 35]: board._positions[p] = BLACK
+        for p in [27, 36]: board._positions[p] = WHITE
+        return cls(board, BLACK)
+
+    # [GameState.copy]
+    # @description: Cheap copy of the game state, including the board
+    #   positions and any cached legal moves
+    # @param1: Self
+    # @return: New game state
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state._board = self._board.copy()
+        state._game_turn = self._game_turn
+        state._passes = self._passes
+        state._available_moves = self._available_moves
+        return state
+
+    # [GameState.resolve]
+    # @description: Generates legal moves for the side to move if they are not
+    #   cached yet. A side with no moves passes, and the game is over once
+    #   both sides have passed in a row.
+    # @param1: Self
+    def resolve(self):
+        while self._available_moves is None:
+            moves = []
+            for pos in range(64):
+                if self._board.is_legal_move(self._game_turn, pos):
+                    moves.append(pos)
+            if len(moves) > 0:
+                self._available_moves = moves
+            elif self._passes == 1:
+                self._game_turn = GAME_OVER
+                self._available_moves = []
+            else:
+                self._passes += 1
+                self._game_turn = self._game_turn^3
+
+    # [GameState.current_player]
+    # @return: Player to move (1 or 2), or GAME_OVER
+    def current_player(self):
+        self.resolve()
+        return self._game_turn
+
+    # [GameState.is_game_over]
+    # @return: True if neither player can move
+    def is_game_over(self):
+        self.resolve()
+        return self._game_turn == GAME_OVER
+
+    # [GameState.passed]
+    # @return: True if the side to move only got the turn because the
+    #   other player had to pass
+    def passed(self):
+        self.resolve()
+        return self._passes == 1
+
+    # [GameState.available_moves]
+    # @return: List of legal moves for the side to move. Empty once the game
+    #   is over.
+    def available_moves(self):
+        self.resolve()
+        return self._available_moves
+
+    # [GameState.play_move]
+    # @description: Plays a move for the side to move and hands the turn
+    #   over. Important, we assume the move is legal!
+    # @param1: Self
+    # @param2: Move position (0 to 63)
+    def play_move(self, move_pos):
+        self.resolve()
+        self._board.play_move(self._game_turn, move_pos)
+        self._game_turn = self._game_turn^3
+        self._passes = 0
+        self._available_moves = None
+
+    # [GameState.player_pieces]
+    # @return: List of piece positions for each player, indexed by player
+    #   number, in the format Board.evaluate_score expects
+    def player_pieces(self):
+        positions = self._board._positions
+        return [[], list(np.flatnonzero(positions == BLACK)), list(np.flatnonzero(positions == WHITE))]
+
+    # [GameState.winner]
+    # @return: BLACK or WHITE for the player with the most pieces, or DRAW
+    def winner(self):
+        num_black = np.count_nonzero(self._board._positions == BLACK)
+        num_white = np.count_nonzero(self._board._positions == WHITE)
+        if num_black > num_white:
+            return BLACK
+        elif num_white > num_black:
+            return WHITE
+        return DRAW
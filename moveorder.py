@@ -0,0 +1,96 @@
+from board import WEIGHTED_POSITIONS
+
+import numpy as np
+
+BLACK = 1
+WHITE = 2
+
+# Number of killer moves remembered per ply
+NUM_KILLER_MOVES = 2
+
+
+class MoveOrderer(object):
+
+    # [MoveOrderer.init]
+    # @description Constructor
+    # @param1: Self
+    # @param2: Board weight table (3x64), used for static move priorities
+    def __init__(self, weighted_positions=WEIGHTED_POSITIONS):
+        self._weighted_positions = weighted_positions
+        self._killer_moves = []
+        self._history = np.zeros(shape=(3, 64), dtype=int)
+        self._hash_moves = {}
+
+    # [MoveOrderer.new_search]
+    # @description: Resets per-search state before searching a new position.
+    #   Killer and hash moves are dropped, history scores are halved so they
+    #   favour recent searches.
+    # @param1: Self
+    # @param2: Board weight table (3x64) for the position being searched
+    def new_search(self, weighted_positions):
+        self._weighted_positions = weighted_positions
+        self._killer_moves = []
+        self._history //= 2
+        self._hash_moves = {}
+
+    # [MoveOrderer.order_moves]
+    # @description: Sorts moves so the likeliest best moves are searched
+    #   first: the hash move from a previous iteration, then killer moves for
+    #   this ply, then by history score, then by static position weight.
+    # @param1: Self
+    # @param2: Player number to order moves for (1 or 2)
+    # @param3: List of available moves
+    # @param4: Search ply (0 at the root)
+    # @param5: Position key, see position_key
+    # @return: New list of moves, best first
+    def order_moves(self, player_num, moves, ply, key):
+        hash_move = self._hash_moves.get(key)
+        killer_moves = self._killer_moves[ply] if ply < len(self._killer_moves) else []
+        history = self._history[player_num]
+        weighted_positions = self._weighted_positions[player_num]
+
+        def move_priority(move):
+            if move == hash_move:
+                tier = NUM_KILLER_MOVES + 1
+            elif move in killer_moves:
+                tier = NUM_KILLER_MOVES - killer_moves.index(move)
+            else:
+                tier = 0
+            return (tier, history[move], weighted_positions[move])
+
+        return sorted(moves, key=move_priority, reverse=True)
+
+    # [MoveOrderer.record_cutoff]
+    # @description: Updates killer moves and history after a move caused a
+    #   beta cutoff
+    # @param1: Self
+    # @param2: Player number who played the move (1 or 2)
+    # @param3: Move position (0 to 63)
+    # @param4: Search ply
+    # @param5: Remaining search depth
+    def record_cutoff(self, player_num, move, ply, depth):
+        while len(self._killer_moves) <= ply:
+            self._killer_moves.append([])
+        killer_moves = self._killer_moves[ply]
+        if move in killer_moves:
+            killer_moves.remove(move)
+        killer_moves.insert(0, move)
+        del killer_moves[NUM_KILLER_MOVES:]
+        self._history[player_num][move] += depth * depth
+
+    # [MoveOrderer.record_best_move]
+    # @description: Remembers the best move found for a position, so the next
+    #   iteration searches it first
+    # @param1: Self
+    # @param2: Position key, see position_key
+    # @param3: Move position (0 to 63)
+    def record_best_move(self, key, move):
+        self._hash_moves[key] = move
+
+
+# [position_key]
+# @description: Builds a hashable key for a board position and player to move
+# @param1: Board
+# @param2: Player to move (1 or 2)
+def position_key(board, player_num):
+    return (board._positions.tobytes(), player_num)
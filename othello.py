@@ -1,6 +1,7 @@
 #!/usr/bin/env python3.6
 
 from game import Game
+from tuning import load_weights
 
 import sys
 
@@ -12,6 +13,7 @@ def main():
 
     human_player = BLACK
     robot_battle = False
+    weights_file = None
 
     # Read command line args. Assume this is a human vs. computer game, with
     # human playing first, unless told otherwise.
@@ -20,12 +22,17 @@ def main():
             print("Options:")
             print("--white: Human plays white, computer goes first")
             print("--robot-battle: Computer plays against itself")
+            print("--weights=FILE: Use board weights saved by tuning.py")
         if(arg == "--white"):
             human_player = WHITE
         if(arg == "--robot-battle"):
             robot_battle = True
+        if(arg.startswith("--weights=")):
+            weights_file = arg[len("--weights="):]
 
     game = Game()
+    if weights_file:
+        game._board.set_weighted_positions(*load_weights(weights_file))
 
     # Human vs computer
     if not robot_battle:
@@ -2,6 +2,7 @@
 
 from __future__ import print_function
 from board import Board
+from gamestate import GameState
 from random import randint
 
 import numpy as np
@@ -15,11 +16,17 @@ GAME_OVER = 3
 
 class RandomGame(object):
 
-    def __init__(self):
-        self._board = Board()
+    # [RandomGame.init]
+    # @description Constructor
+    # @param1: Self
+    # @param2: Board to play on. The board is played on directly, so pass a
+    #   copy if the original needs to be kept. Defaults to an empty board.
+    def __init__(self, board=None):
+        if board is None:
+            board = Board()
+        self._board = board
         self._player_names = ["","Black","White"]
         self._player_pieces = [[],[],[]]
-        self._available_moves = [[],[],[]]
 
     # [RandomGame.set_player_pieces]
     # @param1: Self
@@ -32,80 +39,45 @@ class RandomGame(object):
                 pieces.append(i)
         self._player_pieces[player_num] = pieces
 
-    # [RandomGame.set_available_moves]
-    # @param1: Self
-    # @param2: Player to set available moves for (1 or 2)
-    # @return: Nothing. Set list of available moves, then exit.
-    def set_available_moves(self, player_num):
-        moves = []
-        for pos in range(64):
-            if self._board.is_legal_move(player_num, pos):
-                moves.append(pos)
-        self._available_moves[player_num] = moves
-    
     # [Game.play]
     # @description: Main game loop. 
     # @param1: Self
     # @param2: Play who moves first
-    def play(self, start_player, verbose=False):
+    # @param3: Print the board after every move
+    # @param4: Optional list to record [positions, player to move] before
+    #   every move played
+    def play(self, start_player, verbose=False, history=None):
 
-        self.set_available_moves(BLACK)
-        self.set_available_moves(WHITE)
-        self._game_turn = start_player
+        state = GameState(self._board, start_player)
 
-        #print("[RandomGame.play] self._available_moves[BLACK]=" + str(self._available_moves[BLACK]))
-        #print("[RandomGame.play] self._available_moves[WHITE]=" + str(self._available_moves[WHITE]))
-        
-        # Main game loop
-        while self._game_turn != GAME_OVER:
+        # Main game loop. The game state takes care of passes and game over.
+        while not state.is_game_over():
 
-            current_player = self._game_turn
-            opponent = self._game_turn^3
-            
-            self.set_player_pieces(BLACK)
-            self.set_player_pieces(WHITE)
+            current_player = state.current_player()
+            available_moves = state.available_moves()
 
             if verbose:
-                self._board.show(self._available_moves[current_player])
+                self.set_player_pieces(BLACK)
+                self.set_player_pieces(WHITE)
+                self._board.show(available_moves)
                 print("\nBlack pieces: " + str(self._player_pieces[BLACK]))
                 print("White pieces: " + str(self._player_pieces[WHITE]))
-                print("Black available moves: " + str(self._available_moves[BLACK]))
-                print("White available moves: " + str(self._available_moves[WHITE]) + "\n")
+                print(str(self._player_names[current_player]) + " available moves: " + str(available_moves) + "\n")
 
-            # Check if current player has any available moves before we play.
-            # This can happen towards the end of the game.
-            if len(self._available_moves[current_player]) == 0:
-                self.set_available_moves(opponent)
-                if len(self._available_moves[opponent]) == 0:
-                    self._game_turn = GAME_OVER
-                else:
-                    self._game_turn = opponent
-                continue
+            if history is not None:
+                history.append([np.copy(self._board._positions), current_player])
 
             # Current player plays a random move
-            move_pos = self._available_moves[current_player][np.random.randint(0, len(self._available_moves[current_player]))]
-            self._board.play_move(current_player, move_pos)
+            move_pos = available_moves[np.random.randint(0, len(available_moves))]
+            state.play_move(move_pos)
             if verbose:
                 print(str(self._player_names[current_player]) + " played " + str(chr((move_pos%8)+97)) + str((move_pos//8)+1) + " (position " + str(move_pos) + ")\n")
-            self.set_available_moves(opponent)
-            # Check if other player passes, or if game is over
-            if len(self._available_moves[opponent]) == 0:
-                self.set_available_moves(current_player)
-                if len(self._available_moves[current_player]) == 0:
-                    self._game_turn = GAME_OVER
-            else:
-                self._game_turn = opponent
 
         # At this point we're out of the main loop, game is over!
-        self.set_player_pieces(BLACK)
-        self.set_player_pieces(WHITE)
         if verbose:
-            self._board.show(self._available_moves[current_player])
+            self.set_player_pieces(BLACK)
+            self.set_player_pieces(WHITE)
+            self._board.show([])
             print("Black has " + str(len(self._player_pieces[BLACK])) + " pieces")
             print("White has " + str(len(self._player_pieces[WHITE])) + " pieces\n")
-        if len(self._player_pieces[BLACK]) > len(self._player_pieces[WHITE]):
-            return BLACK
-        elif len(self._player_pieces[WHITE]) > len(self._player_pieces[BLACK]):
-            return WHITE
-        else:
-            return DRAW
\ No newline at end of file
+        return state.winner()
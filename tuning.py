@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+from anytree import Node
+from board import Board
+from game import Game, MINMAX_DEPTH
+from gamestate import GameState
+from multiprocessing import Pool, cpu_count
+from randomgame import RandomGame
+
+import argparse
+import numpy as np
+
+BLACK = 1
+WHITE = 2
+
+# Tuning defaults
+SELF_PLAY_NUM_GAMES = 20000
+VALIDATION_NUM_GAMES = 40
+VALIDATION_RANDOM_OPENING_MOVES = 4
+VALIDATION_CONFIDENCE_Z = 1.645
+REGULARIZATION = 1.0
+WEIGHT_SCALE = 120
+
+
+# [build_symmetry_matrix]
+# @description: Builds a 64x10 matrix mapping every board position to one of
+#   the 10 position classes that are equal under rotation and reflection. Used
+#   to fit symmetric weights with 10 unknowns instead of 64.
+# @return: Numpy array of shape (64, 10)
+def build_symmetry_matrix():
+    symmetry_matrix = np.zeros(shape=(64, 10))
+    for pos in range(64):
+        row = min(pos // 8, 7 - (pos // 8))
+        col = min(pos % 8, 7 - (pos % 8))
+        a, b = min(row, col), max(row, col)
+        symmetry_matrix[pos][a*4 - a*(a-1)//2 + (b-a)] = 1
+    return symmetry_matrix
+
+SYMMETRY_MATRIX = build_symmetry_matrix()
+
+
+# [play_self_play_game]
+# @description: Plays one random game and labels every position in it with
+#   the final piece difference for the player to move
+# @param1: Random seed for this game
+# @return: List of [positions, player to move, final piece difference]
+def play_self_play_game(seed):
+    np.random.seed(seed)
+    random_game = RandomGame(GameState.starting_position()._board)
+    history = []
+    random_game.play(BLACK, False, history)
+    final_positions = random_game._board._positions
+    black_difference = int(np.count_nonzero(final_positions == BLACK)) - int(np.count_nonzero(final_positions == WHITE))
+    samples = []
+    for positions, player_num in history:
+        if player_num == BLACK:
+            samples.append([positions, player_num, black_difference])
+        else:
+            samples.append([positions, player_num, -black_difference])
+    return samples
+
+
+# [generate_positions]
+# @description: Builds a labelled position set from self-play games, played
+#   in parallel
+# @param1: Number of games to play
+# @param2: Number of worker processes
+# @return: Tuple of (positions (N, 64), players to move (N), outcomes (N))
+def generate_positions(num_games, processes):
+    pool = Pool(processes)
+    try:
+        games = pool.map(play_self_play_game, range(num_games))
+    finally:
+        pool.close()
+        pool.join()
+    samples = [sample for game_samples in games for sample in game_samples]
+    positions = np.array([sample[0] for sample in samples], dtype=np.int8)
+    players = np.array([sample[1] for sample in samples], dtype=np.int8)
+    outcomes = np.array([sample[2] for sample in samples], dtype=float)
+    return positions, players, outcomes
+
+
+# [fit_weights]
+# @description: Fits position weights to the labelled position set with
+#   ridge regression. Board.evaluate_score is linear in the weights, with a
+#   feature of +1 for each of the player's pieces and -1 for each opponent
+#   piece, so the whole data set is solved at once per phase.
+# @param1: Positions array (N, 64)
+# @param2: Player to move for each position (N)
+# @param3: Final piece difference for the player to move (N)
+# @param4: Piece counts at which each phase after the first begins
+# @param5: Fit one weight per symmetric position class instead of per square
+# @param6: Ridge regularization strength
+# @return: List of phase weights, each a list of 64 integer weights
+def fit_weights(positions, players, outcomes, phase_starts=(), symmetric=True, regularization=REGULARIZATION):
+    players = players.reshape(-1, 1)
+    features = (positions == players).astype(float) - ((positions != 0) & (positions != players)).astype(float)
+    if symmetric:
+        features = features.dot(SYMMETRY_MATRIX)
+    # Positions are recorded before the player to move plays, but the engine
+    # scores positions after a move, so bucket by the piece count after it
+    num_pieces = (positions != 0).sum(axis=1) + 1
+    sample_phases = np.searchsorted(np.array(phase_starts, dtype=int), num_pieces, side="right")
+
+    phase_weights = []
+    for phase in range(len(phase_starts) + 1):
+        phase_features = features[sample_phases == phase]
+        phase_outcomes = outcomes[sample_phases == phase]
+        if len(phase_outcomes) == 0:
+            raise ValueError("No positions in phase " + str(phase))
+        num_features = phase_features.shape[1]
+        weights = np.linalg.solve(
+            phase_features.T.dot(phase_features) + regularization * np.eye(num_features),
+            phase_features.T.dot(phase_outcomes))
+        if symmetric:
+            weights = SYMMETRY_MATRIX.dot(weights)
+        # Scale to the same range as the hand-tuned weights
+        weights = np.rint(weights * WEIGHT_SCALE / max(np.abs(weights).max(), 1e-9)).astype(int)
+        phase_weights.append(list(weights))
+    return phase_weights
+
+
+# [choose_minmax_move]
+# @description: Picks the best minmax move for the player to move, without
+#   monte carlo simulations, so that validation matches stay fast
+# @param1: Game to build the minmax tree in
+# @param2: Game state to choose a move in
+# @return: Move position (0 to 63)
+def choose_minmax_move(game, state):
+    player_num = state.current_player()
+    game._minmax_tree = Node("root")
+    game.build_minmax_tree(state, game._minmax_tree, MINMAX_DEPTH, player_num)
+    minmax_results = game.get_minmax_results()
+    best_move = minmax_results[0][0]
+    best_move_score = minmax_results[0][1]
+    for result in minmax_results:
+        if result[1] > best_move_score:
+            best_move = result[0]
+            best_move_score = result[1]
+    return best_move
+
+
+# [play_match]
+# @description: Plays one validation game between candidate and baseline
+#   weights. The first few moves are random so that matches differ.
+# @param1: Tuple of (candidate weights, baseline weights, candidate player,
+#   random seed), where weights are (phase weights, phase starts)
+# @return: 1 if the candidate wins, 0.5 for a draw, 0 if it loses
+def play_match(match):
+    candidate, baseline, candidate_player, seed = match
+    np.random.seed(seed)
+    player_weights = [None, None, None]
+    player_weights[candidate_player] = candidate
+    player_weights[candidate_player^3] = baseline
+
+    game = Game()
+    state = GameState.starting_position(game._board)
+    num_moves = 0
+    # The game state takes care of passes and game over
+    while not state.is_game_over():
+        current_player = state.current_player()
+        available_moves = state.available_moves()
+        if num_moves < VALIDATION_RANDOM_OPENING_MOVES:
+            move_pos = available_moves[np.random.randint(0, len(available_moves))]
+        else:
+            game._board.set_weighted_positions(*player_weights[current_player])
+            move_pos = choose_minmax_move(game, state)
+        state.play_move(move_pos)
+        num_moves += 1
+
+    winner = state.winner()
+    if winner == candidate_player:
+        return 1.0
+    elif winner == candidate_player^3:
+        return 0.0
+    return 0.5
+
+
+# [validate_weights]
+# @description: Plays candidate weights against baseline weights in parallel,
+#   alternating colours between games
+# @param1: Candidate weights (phase weights, phase starts)
+# @param2: Baseline weights (phase weights, phase starts)
+# @param3: Number of games to play
+# @param4: Number of worker processes
+# @return: Candidate score between 0 and 1
+def validate_weights(candidate, baseline, num_games, processes):
+    matches = []
+    for i in range(num_games):
+        matches.append((candidate, baseline, BLACK if i % 2 == 0 else WHITE, i))
+    pool = Pool(processes)
+    try:
+        results = pool.map(play_match, matches)
+    finally:
+        pool.close()
+        pool.join()
+    return sum(results) / float(num_games)
+
+
+# [is_significant_improvement]
+# @description: One-sided test that a validation score is better than an even
+#   result, using the normal approximation to the binomial with the worst case
+#   variance (draws only make the real variance smaller)
+# @param1: Candidate score between 0 and 1
+# @param2: Number of games played
+# @return: True if the score beats 0.5 by more than VALIDATION_CONFIDENCE_Z
+#   standard errors
+def is_significant_improvement(score, num_games):
+    return score - 0.5 > VALIDATION_CONFIDENCE_Z * np.sqrt(0.25 / num_games)
+
+
+# [save_weights]
+# @description: Saves phase weights to a numpy .npz file
+def save_weights(filename, phase_weights, phase_starts):
+    np.savez(filename, phase_weights=np.array(phase_weights, dtype=int), phase_starts=np.array(phase_starts, dtype=int))
+
+
+# [load_weights]
+# @description: Loads phase weights saved by save_weights
+# @return: Tuple of (phase weights, phase starts), ready for
+#   Board.set_weighted_positions
+def load_weights(filename):
+    data = np.load(filename)
+    phase_weights = [list(weights) for weights in data["phase_weights"]]
+    phase_starts = [int(start) for start in data["phase_starts"]]
+    return phase_weights, phase_starts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune board weights from self-play games")
+    parser.add_argument("--games", type=int, default=SELF_PLAY_NUM_GAMES, help="Number of self-play games")
+    parser.add_argument("--phases", default="", help="Comma separated piece counts where each game phase begins, e.g. 20,44")
+    parser.add_argument("--no-symmetry", action="store_true", help="Fit all 64 weights independently")
+    parser.add_argument("--regularization", type=float, default=REGULARIZATION, help="Ridge regularization strength")
+    parser.add_argument("--matches", type=int, default=VALIDATION_NUM_GAMES, help="Number of validation games per candidate")
+    parser.add_argument("--processes", type=int, default=cpu_count(), help="Number of worker processes")
+    parser.add_argument("--output", default="weights.npz", help="File to save the best weights to")
+    args = parser.parse_args()
+
+    print("Playing " + str(args.games) + " self-play games...")
+    positions, players, outcomes = generate_positions(args.games, args.processes)
+    print("Collected " + str(len(outcomes)) + " positions")
+
+    # Fit a single phase candidate, plus a phased candidate if requested
+    phase_starts = [int(start) for start in args.phases.split(",") if start]
+    candidates = [[fit_weights(positions, players, outcomes, (), not args.no_symmetry, args.regularization), []]]
+    if phase_starts:
+        candidates.append([fit_weights(positions, players, outcomes, phase_starts, not args.no_symmetry, args.regularization), phase_starts])
+
+    baseline = ([list(Board()._weighted_positions[BLACK])], [])
+    best_candidate = None
+    best_score = 0.5
+    for candidate in candidates:
+        score = validate_weights(candidate, baseline, args.matches, args.processes)
+        print("Candidate with " + str(len(candidate[0])) + " phase(s) scored " + str(score) + " against baseline")
+        for weights in candidate[0]:
+            print(np.array(weights).reshape(8, 8))
+        if score > best_score and is_significant_improvement(score, args.matches):
+            best_candidate = candidate
+            best_score = score
+
+    if best_candidate is None:
+        print("No candidate beat the baseline weights significantly")
+    else:
+        save_weights(args.output, best_candidate[0], best_candidate[1])
+        print("Saved weights to " + args.output)
+
+
+if __name__ == "__main__":
+    main()